@@ -11,17 +11,187 @@ Author: Generated for CollectionsAPI project
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import argparse
+import logging
+import os
 import sys
-from typing import List, Dict
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
 import time
-from urllib.parse import quote
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+
+if msgspec is not None:
+    class ProjectRef(msgspec.Struct):
+        """JSON:API reference to a project."""
+        id: str
+        type: str = "project"
+    
+    class ProjectRefs(msgspec.Struct):
+        """JSON:API relationships body referencing projects."""
+        data: List[ProjectRef]
+    
+    class CollectionAttributes(msgspec.Struct):
+        """Attributes of a collection to create."""
+        name: str
+    
+    class CollectionData(msgspec.Struct):
+        """JSON:API resource object for a collection to create."""
+        attributes: CollectionAttributes
+        type: str = "collection"
+    
+    class CollectionBody(msgspec.Struct):
+        """JSON:API body of a create collection request."""
+        data: CollectionData
+
+
+def _json_loads(content: bytes) -> Any:
+    """
+    Decode a JSON document, using orjson when it is installed.
+    
+    Args:
+        content: Raw JSON bytes
+        
+    Returns:
+        Decoded Python object
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """
+    Encode an object as compact UTF-8 JSON, using orjson when it is installed.
+    
+    Args:
+        obj: Object to encode
+        
+    Returns:
+        Encoded JSON bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _project_refs_body(project_ids: List[str]) -> bytes:
+    """
+    Encode a JSON:API relationships body referencing the given projects.
+    
+    With msgspec installed the body is encoded from typed structs in a single C
+    pass; otherwise each reference is spliced from a fixed template around the
+    encoded ID, so no intermediate dictionary is built per project.
+    
+    Args:
+        project_ids: Project IDs to reference
+        
+    Returns:
+        Encoded body of the form {"data":[{"id":...,"type":"project"},...]}
+    """
+    if msgspec is not None:
+        return msgspec.json.encode(ProjectRefs(data=[ProjectRef(id=project_id) for project_id in project_ids]))
+    
+    refs = b','.join(b'{"id":' + _json_dumps(project_id) + b',"type":"project"}' for project_id in project_ids)
+    return b'{"data":[' + refs + b']}'
+
+
+def _collection_body(collection_name: str) -> bytes:
+    """
+    Encode a JSON:API body creating a collection with the given name.
+    
+    Args:
+        collection_name: Name of the collection to create
+        
+    Returns:
+        Encoded body of the form {"data":{"type":"collection","attributes":{"name":...}}}
+    """
+    if msgspec is not None:
+        return msgspec.json.encode(CollectionBody(data=CollectionData(attributes=CollectionAttributes(name=collection_name))))
+    
+    payload = {
+        'data': {
+            'type': 'collection',
+            'attributes': {
+                'name': collection_name
+            }
+        }
+    }
+    return _json_dumps(payload)
+
+
+def _parse_response(response: requests.Response) -> Any:
+    """
+    Decode a JSON API response body.
+    
+    Args:
+        response: Response to decode
+        
+    Returns:
+        Decoded response body
+        
+    Raises:
+        requests.exceptions.InvalidJSONError: If the body is not valid JSON
+    """
+    try:
+        return _json_loads(response.content)
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(f"Invalid JSON in response: {e}", response=response)
+
+
+def _chunks(items: List, size: int = 100) -> Iterator[List]:
+    """
+    Split a list into consecutive chunks of at most size items.
+    
+    Args:
+        items: List to split
+        size: Maximum chunk length
+        
+    Yields:
+        Slices of the input list
+    """
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
 class SnykCollectionsManager:
     """Manages Snyk projects and collections using the Snyk REST API."""
     
+    __slots__ = (
+        "api_token",
+        "org_id",
+        "base_url",
+        "api_version",
+        "headers",
+        "session",
+        "_create_session",
+        "_collections_by_name",
+        "_collection_pages",
+        "_page_limit",
+    )
+    
+    # Page size requested from paginated endpoints (the REST API maximum)
+    PAGE_LIMIT = 100
+    # Maximum number of projects sent in one relationships request
+    BATCH_SIZE = 100
+    # Maximum number of relationship batches posted concurrently
+    MAX_CONCURRENT_BATCHES = 8
+    
     def __init__(self, api_token: str, org_id: str):
         """
         Initialize the Snyk Collections Manager.
@@ -39,11 +209,160 @@ class SnykCollectionsManager:
             'Content-Type': 'application/vnd.api+json',
             'Accept': 'application/vnd.api+json'
         }
+        
+        # Reuse one keep-alive connection pool for every request instead of
+        # paying a TCP+TLS handshake per page and per mutation
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # Absorb rate limiting and transient server errors with exponential
+        # backoff (honouring Retry-After) rather than aborting the whole run
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            allowed_methods=frozenset(["GET", "POST"])
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry))
+        
+        # Creating a collection is not idempotent: a 5xx or a dropped response may
+        # arrive after the server has committed the create, so only retry when the
+        # request never reached it (connect errors) or was explicitly rate limited
+        self._create_session = requests.Session()
+        self._create_session.headers.update(self.headers)
+        create_retry = Retry(
+            total=5,
+            connect=5,
+            read=0,
+            backoff_factor=0.5,
+            status_forcelist=[429],
+            respect_retry_after_header=True,
+            allowed_methods=frozenset(["POST"])
+        )
+        self._create_session.mount("https://", HTTPAdapter(pool_maxsize=1, max_retries=create_retry))
+        
+        # Name -> collection index filled by find_collection_by_name(), and the
+        # partially consumed collection listing it resumes from (None once exhausted)
+        self._collections_by_name: Optional[Dict[str, Dict]] = None
+        self._collection_pages: Optional[Iterator[List[Dict]]] = None
+        # Page size for listings; cleared if the API rejects it
+        self._page_limit: Optional[int] = self.PAGE_LIMIT
+    
+    def _resolve_link(self, link: str) -> str:
+        """
+        Turn a pagination link from a REST API response into an absolute URL.
+        
+        Args:
+            link: Absolute URL, or path relative to the API host (with or without the /rest prefix)
+            
+        Returns:
+            Absolute URL
+        """
+        if not link.startswith('/'):
+            return link
+        if link.startswith('/rest/'):
+            return self.base_url[:-len('/rest')] + link
+        return self.base_url + link
+    
+    def _iter_pages(self, url: str, resource: str, params: Dict = None) -> Iterator[List[Dict]]:
+        """
+        Follow the REST API pagination links, yielding each page's data as it arrives.
+        
+        Snyk REST pagination is cursor-based (starting_after/ending_before), so
+        later page URLs cannot be derived up front and pages are walked in order
+        through links.next over the shared keep-alive session. Only the current
+        page is held in memory.
+        
+        Args:
+            url: URL of the first page
+            resource: Resource name used in progress output
+            params: Query parameters for the first page; later pages use links.next as returned
+            
+        Yields:
+            List of items on each page
+            
+        Raises:
+            requests.exceptions.RequestException: If any page request fails
+        """
+        while url:
+            print(f"Fetching {resource} from: {url}")
+            response = self.session.get(url, params=params)
+            if response.status_code == 400 and params and 'limit' in params:
+                # The endpoint rejected the page size; fall back to the server default
+                # for this and every later listing in the run
+                print(f"Page size {params['limit']} rejected for {resource}, retrying with the default page size...")
+                self._page_limit = None
+                params = {key: value for key, value in params.items() if key != 'limit'}
+                continue
+            response.raise_for_status()
+            data = _parse_response(response)
+            
+            # Extract items from the REST API response format
+            page_data = data.get('data', [])
+            
+            # Check for pagination; the next link already carries every query parameter
+            links = data.get('links', {})
+            url = links.get('next')
+            params = None
+            
+            if url:
+                url = self._resolve_link(url)
+                print(f"Found {len(page_data)} {resource} on this page, continuing to next page...")
+            
+            yield page_data
+    
+    def _page_params(self) -> Dict:
+        """
+        Build the query parameters shared by the first page of every paginated listing.
+        
+        Returns:
+            Query parameter dictionary with the API version and, unless it has been
+            rejected earlier in the run, the maximum page size
+        """
+        params = {'version': self.api_version}
+        if self._page_limit:
+            params['limit'] = self._page_limit
+        return params
+    
+    def _projects_params(self, name_prefix: str) -> Dict:
+        """
+        Build the query parameters for the first page of projects matching a name prefix.
+        
+        Args:
+            name_prefix: The prefix to match project names against
+            
+        Returns:
+            Query parameter dictionary (encoded by requests)
+        """
+        params = self._page_params()
+        # Only include names_start_with if prefix is not empty
+        if name_prefix:
+            params['names_start_with'] = name_prefix
+        return params
+    
+    def _print_projects_error(self, e: requests.exceptions.RequestException) -> None:
+        """
+        Print a user-facing explanation of a failed projects request.
+        
+        Args:
+            e: The request exception that was raised
+        """
+        print(f"Error retrieving projects: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            if e.response.status_code == 404:
+                print(f"⚠️  Projects endpoint not found. This organization may not have projects yet.")
+            elif e.response.status_code == 401:
+                print(f"⚠️  Unauthorized. Please check your API token and organization ID.")
+            elif e.response.status_code == 403:
+                print(f"⚠️  Forbidden. You may not have permission to access projects.")
     
     def get_projects_by_name_prefix(self, name_prefix: str) -> List[Dict]:
         """
         Retrieve projects that start with the specified name prefix using the REST API.
         
+        Returns the full project records; use extract_project_ids() when only the
+        IDs are needed.
+        
         Args:
             name_prefix: The prefix to match project names against
             
@@ -55,53 +374,54 @@ class SnykCollectionsManager:
         else:
             print(f"Retrieving all projects (no prefix filter)")
         
-        projects = []
-        # URL-encode the prefix and only include names_start_with if prefix is not empty
-        if name_prefix:
-            encoded_prefix = quote(name_prefix, safe='')
-            url = f"{self.base_url}/orgs/{self.org_id}/projects?version={self.api_version}&names_start_with={encoded_prefix}"
-        else:
-            url = f"{self.base_url}/orgs/{self.org_id}/projects?version={self.api_version}"
+        url = f"{self.base_url}/orgs/{self.org_id}/projects"
+        params = self._projects_params(name_prefix)
         
         try:
-            while url:
-                print(f"Fetching projects from: {url}")
-                response = requests.get(url, headers=self.headers)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Extract projects from the REST API response format
-                project_data = data.get('data', [])
-                projects.extend(project_data)
-                
-                # Check for pagination
-                links = data.get('links', {})
-                url = links.get('next')
-                
-                if url:
-                    print(f"Found {len(project_data)} projects on this page, continuing to next page...")
+            projects = [project for page in self._iter_pages(url, "projects", params) for project in page]
             
             print(f"Found {len(projects)} projects matching prefix '{name_prefix}'")
-            for project in projects:
-                # REST API uses 'attributes' for project data
-                attributes = project.get('attributes', {})
-                project_name = attributes.get('name', 'Unknown')
-                project_id = project.get('id', 'Unknown')
-                print(f"  - {project_name} (ID: {project_id})")
+            if logger.isEnabledFor(logging.DEBUG):
+                for project in projects:
+                    # REST API uses 'attributes' for project data
+                    attributes = project.get('attributes', {})
+                    project_name = attributes.get('name', 'Unknown')
+                    project_id = project.get('id', 'Unknown')
+                    logger.debug("  - %s (ID: %s)", project_name, project_id)
             
             return projects
             
         except requests.exceptions.RequestException as e:
-            print(f"Error retrieving projects: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                if e.response.status_code == 404:
-                    print(f"⚠️  Projects endpoint not found. This organization may not have projects yet.")
-                elif e.response.status_code == 401:
-                    print(f"⚠️  Unauthorized. Please check your API token and organization ID.")
-                elif e.response.status_code == 403:
-                    print(f"⚠️  Forbidden. You may not have permission to access projects.")
+            self._print_projects_error(e)
             return []
     
+    def _print_collections_error(self, e: requests.exceptions.RequestException) -> None:
+        """
+        Print a user-facing explanation of a failed collections request.
+        
+        Args:
+            e: The request exception that was raised
+        """
+        print(f"Error retrieving collections: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            if e.response.status_code == 404:
+                print(f"⚠️  Collections are not available for this organization (404 Not Found)")
+                print(f"   Collections might be a premium feature or not enabled.")
+                print(f"   The script cannot proceed without collections support.")
+            elif e.response.status_code == 401:
+                print(f"⚠️  Unauthorized. Please check your API token and organization ID.")
+            elif e.response.status_code == 403:
+                print(f"⚠️  Forbidden. You may not have permission to access collections.")
+    
+    def _print_collections_unavailable(self) -> None:
+        """Print why collections may not be available for the organization."""
+        print(f"❌ Collections are not available for this organization.")
+        print(f"   This could be because:")
+        print(f"   1. Collections are a premium feature")
+        print(f"   2. Collections are not enabled for your organization")
+        print(f"   3. Your organization type doesn't support collections")
+        print(f"   Please contact Snyk support or upgrade your plan to use collections.")
+    
     def get_collections(self) -> List[Dict]:
         """
         Retrieve all collections for the organization using the REST API.
@@ -111,124 +431,107 @@ class SnykCollectionsManager:
         """
         print("Retrieving existing collections...")
         
-        collections = []
-        url = f"{self.base_url}/orgs/{self.org_id}/collections?version={self.api_version}"
+        url = f"{self.base_url}/orgs/{self.org_id}/collections"
         
         try:
-            while url:
-                print(f"Fetching collections from: {url}")
-                response = requests.get(url, headers=self.headers)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Extract collections from the REST API response format
-                collection_data = data.get('data', [])
-                collections.extend(collection_data)
-                
-                # Check for pagination
-                links = data.get('links', {})
-                url = links.get('next')
-                
-                if url:
-                    print(f"Found {len(collection_data)} collections on this page, continuing to next page...")
+            collections = [collection for page in self._iter_pages(url, "collections", self._page_params()) for collection in page]
             
             print(f"Found {len(collections)} existing collections")
-            for collection in collections:
-                # REST API uses 'attributes' for collection data
-                attributes = collection.get('attributes', {})
-                collection_name = attributes.get('name', 'Unknown')
-                collection_id = collection.get('id', 'Unknown')
-                print(f"  - {collection_name} (ID: {collection_id})")
+            if logger.isEnabledFor(logging.DEBUG):
+                for collection in collections:
+                    # REST API uses 'attributes' for collection data
+                    attributes = collection.get('attributes', {})
+                    collection_name = attributes.get('name', 'Unknown')
+                    collection_id = collection.get('id', 'Unknown')
+                    logger.debug("  - %s (ID: %s)", collection_name, collection_id)
             
             return collections
             
         except requests.exceptions.RequestException as e:
-            print(f"Error retrieving collections: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                if e.response.status_code == 404:
-                    print(f"⚠️  Collections are not available for this organization (404 Not Found)")
-                    print(f"   Collections might be a premium feature or not enabled.")
-                    print(f"   The script cannot proceed without collections support.")
-                elif e.response.status_code == 401:
-                    print(f"⚠️  Unauthorized. Please check your API token and organization ID.")
-                elif e.response.status_code == 403:
-                    print(f"⚠️  Forbidden. You may not have permission to access collections.")
+            self._print_collections_error(e)
             return []
     
-    def find_collection_by_name(self, collection_name: str) -> Dict:
+    def find_collection_by_name(self, collection_name: str) -> Optional[Dict]:
         """
         Find a collection by name using the REST API format.
         
+        Collections are listed page by page only until the name is found. Every
+        collection seen is kept in a name index, and a later lookup resumes the
+        listing where the previous one stopped instead of starting over.
+        
         Args:
             collection_name: Name of the collection to find
             
         Returns:
             Collection dictionary if found, None otherwise
+            
+        Raises:
+            requests.exceptions.RequestException: If listing collections fails, so a
+                failed lookup is never mistaken for a missing collection
         """
-        collections = self.get_collections()
+        if self._collections_by_name is None:
+            print(f"Looking up collection: '{collection_name}'")
+            url = f"{self.base_url}/orgs/{self.org_id}/collections"
+            self._collections_by_name = {}
+            self._collection_pages = self._iter_pages(url, "collections", self._page_params())
         
-        for collection in collections:
-            # REST API uses 'attributes' for collection data
-            attributes = collection.get('attributes', {})
-            if attributes.get('name') == collection_name:
-                return collection
+        if collection_name in self._collections_by_name:
+            return self._collections_by_name[collection_name]
         
+        if self._collection_pages is None:
+            # Every collection has already been indexed
+            return None
+        
+        try:
+            for page in self._collection_pages:
+                for collection in page:
+                    # REST API uses 'attributes' for collection data
+                    name = collection.get('attributes', {}).get('name')
+                    # Keep the first collection with a given name, as a linear scan would
+                    self._collections_by_name.setdefault(name, collection)
+                
+                if collection_name in self._collections_by_name:
+                    return self._collections_by_name[collection_name]
+        except requests.exceptions.RequestException:
+            # Start over on the next lookup rather than trusting a partial index
+            self._collections_by_name = None
+            self._collection_pages = None
+            raise
+        
+        self._collection_pages = None
         return None
     
-    def create_collection(self, collection_name: str, project_ids: List[str] = None) -> Dict:
+    def create_collection(self, collection_name: str) -> Optional[Dict]:
         """
-        Create a new collection using the REST API format.
+        Create a new, empty collection using the REST API format.
+        
+        Projects are added separately with add_projects_to_collection().
         
         Args:
             collection_name: Name of the collection to create
-            project_ids: Optional list of project IDs to include
             
         Returns:
-            Created collection dictionary
+            Created collection dictionary, or None if collections are not
+            available for the organization (404 Not Found)
         """
-        if project_ids:
-            print(f"Creating collection '{collection_name}' with {len(project_ids)} projects...")
-        else:
-            print(f"Creating collection: '{collection_name}'")
+        print(f"Creating collection: '{collection_name}'")
         
         url = f"{self.base_url}/orgs/{self.org_id}/collections?version={self.api_version}"
         
-        # Create payload with projects included if provided
-        payload = {
-            'data': {
-                'type': 'collection',
-                'attributes': {
-                    'name': collection_name
-                }
-            }
-        }
-        
-        # Add projects to the payload if provided
-        if project_ids:
-            payload['data']['relationships'] = {
-                'projects': {
-                    'data': [
-                        {
-                            'id': project_id,
-                            'type': 'project'
-                        } for project_id in project_ids
-                    ]
-                }
-            }
-        
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = self._create_session.post(url, data=_collection_body(collection_name))
             response.raise_for_status()
-            collection_data = response.json()
+            collection_data = _parse_response(response)
             
             # Extract collection from REST API response format
             collection = collection_data.get('data', {})
             collection_id = collection.get('id', 'Unknown')
             
-            if project_ids:
-                print(f"Successfully created collection '{collection_name}' with {len(project_ids)} projects (ID: {collection_id})")
-            else:
-                print(f"Successfully created collection '{collection_name}' (ID: {collection_id})")
+            # Keep the name index current without refetching it
+            if self._collections_by_name is not None:
+                self._collections_by_name.setdefault(collection_name, collection)
+            
+            print(f"Successfully created collection '{collection_name}' (ID: {collection_id})")
             
             return collection
             
@@ -237,55 +540,90 @@ class SnykCollectionsManager:
             if hasattr(e, 'response') and e.response is not None:
                 print(f"Response status: {e.response.status_code}")
                 print(f"Response body: {e.response.text}")
+                if e.response.status_code == 404:
+                    return None
+            sys.exit(1)
+    
+    def find_or_create_collection(self, collection_name: str) -> Optional[Dict]:
+        """
+        Find a collection by name, creating an empty one if it does not exist.
+        
+        Args:
+            collection_name: Name of the collection
             
-            # If creating with projects fails, try creating without projects
-            if project_ids:
-                print("Falling back to creating collection without projects...")
-                return self.create_collection(collection_name)
-            else:
-                sys.exit(1)
+        Returns:
+            Existing or newly created collection dictionary, or None if
+            collections are not available for the organization
+            
+        Raises:
+            requests.exceptions.RequestException: If listing collections fails
+        """
+        collection = self.find_collection_by_name(collection_name)
+        
+        if collection:
+            print(f"Collection '{collection_name}' already exists (ID: {collection['id']})")
+            return collection
+        
+        return self.create_collection(collection_name)
+    
+    def _post_project_batch(self, url: str, project_ids: List[str]) -> bool:
+        """
+        Post a single batch of project relationships to a collection.
+        
+        Args:
+            url: Collection relationships endpoint
+            project_ids: Project IDs in this batch
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            response = self.session.post(url, data=_project_refs_body(project_ids))
+            response.raise_for_status()
+            return True
+            
+        except requests.exceptions.RequestException as e:
+            print(f"Error adding batch of {len(project_ids)} projects to collection: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response status: {e.response.status_code}")
+                print(f"Response body: {e.response.text}")
+            return False
     
     def add_projects_to_collection(self, collection_id: str, project_ids: List[str], collection_name: str = "Collection") -> bool:
         """
         Add projects to a collection using the REST API format.
         
+        Projects are posted in batches of BATCH_SIZE, with up to MAX_CONCURRENT_BATCHES
+        requests in flight at once over the shared session.
+        
         Args:
             collection_id: ID of the collection
             project_ids: List of project IDs to add
             
         Returns:
-            True if successful, False otherwise
+            True if every batch succeeded, False otherwise
         """
         if not project_ids:
             print("No projects to add to collection")
             return True
         
-        print(f"Adding {len(project_ids)} projects to collection...")
+        batches = list(_chunks(project_ids, self.BATCH_SIZE))
+        print(f"Adding {len(project_ids)} projects to collection in {len(batches)} batch(es)...")
         
         # Use the correct endpoint for adding projects to a collection
         url = f"{self.base_url}/orgs/{self.org_id}/collections/{collection_id}/relationships/projects?version={self.api_version}"
-        payload = {
-            'data': [
-                {
-                    'id': project_id,
-                    'type': 'project'
-                } for project_id in project_ids
-            ]
-        }
         
-        try:
-            response = requests.post(url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            
-            print(f"Successfully added {len(project_ids)} projects to collection")
-            return True
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Error adding projects to collection: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Response status: {e.response.status_code}")
-                print(f"Response body: {e.response.text}")
+        with ThreadPoolExecutor(max_workers=min(self.MAX_CONCURRENT_BATCHES, len(batches))) as executor:
+            results = list(executor.map(lambda batch: self._post_project_batch(url, batch), batches))
+        
+        failed = [batch for batch, ok in zip(batches, results) if not ok]
+        if failed:
+            failed_count = sum(len(batch) for batch in failed)
+            print(f"Failed to add {failed_count} of {len(project_ids)} projects ({len(failed)} of {len(batches)} batches failed)")
             return False
+        
+        print(f"Successfully added {len(project_ids)} projects to collection")
+        return True
     
     def extract_project_ids(self, name_prefix: str) -> List[str]:
         """
@@ -299,12 +637,33 @@ class SnykCollectionsManager:
         """
         print(f"Extracting project IDs with name prefix: '{name_prefix}'")
         
-        projects = self.get_projects_by_name_prefix(name_prefix)
-        project_ids = [project['id'] for project in projects]
+        url = f"{self.base_url}/orgs/{self.org_id}/projects"
+        params = self._projects_params(name_prefix)
+        # Insertion-ordered set of IDs: drops duplicates from overlapping pages
+        # while keeping the order the API returned them in
+        unique_ids: Dict[str, None] = {}
+        verbose = logger.isEnabledFor(logging.DEBUG)
         
-        print(f"Extracted {len(project_ids)} project IDs:")
-        for i, project_id in enumerate(project_ids, 1):
-            print(f"  {i}. {project_id}")
+        # Keep only the IDs as each page streams in, so full project records
+        # are never retained
+        try:
+            for page in self._iter_pages(url, "projects", params):
+                unique_ids.update(dict.fromkeys(project['id'] for project in page))
+                if verbose:
+                    for project in page:
+                        # REST API uses 'attributes' for project data
+                        project_name = project.get('attributes', {}).get('name', 'Unknown')
+                        logger.debug("  - %s (ID: %s)", project_name, project['id'])
+        except requests.exceptions.RequestException as e:
+            self._print_projects_error(e)
+            return []
+        
+        project_ids = list(unique_ids)
+        print(f"Found {len(project_ids)} projects matching prefix '{name_prefix}'")
+        print(f"Extracted {len(project_ids)} project IDs")
+        if verbose:
+            for i, project_id in enumerate(project_ids, 1):
+                logger.debug("  %d. %s", i, project_id)
         
         return project_ids
     
@@ -312,6 +671,9 @@ class SnykCollectionsManager:
         """
         Save project IDs to a file.
         
+        The file is written to a temporary file alongside the target and then
+        moved into place, so an interrupted run never leaves a partial file.
+        
         Args:
             project_ids: List of project IDs to save
             output_file: Optional output file path
@@ -319,15 +681,26 @@ class SnykCollectionsManager:
         if not output_file:
             output_file = f"project_ids_{int(time.time())}.txt"
         
+        output_dir = os.path.dirname(os.path.abspath(output_file))
+        temp_path = None
+        
         try:
-            with open(output_file, 'w') as f:
-                for project_id in project_ids:
-                    f.write(f"{project_id}\n")
+            with tempfile.NamedTemporaryFile('w', dir=output_dir, prefix='.project_ids_', suffix='.tmp', delete=False) as f:
+                temp_path = f.name
+                f.writelines(f"{project_id}\n" for project_id in project_ids)
+            # NamedTemporaryFile creates the file as 0600; give it the mode a plain
+            # open() would have so the replaced file keeps normal permissions
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+            os.replace(temp_path, output_file)
             
             print(f"Project IDs saved to: {output_file}")
             
         except Exception as e:
             print(f"Error saving project IDs to file: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
     
     def process_projects_and_collection(self, project_name_prefix: str, collection_name: str, output_file: str = None) -> List[str]:
         """
@@ -347,38 +720,39 @@ class SnykCollectionsManager:
         print(f"Collection name: '{collection_name}'")
         print("-" * 50)
         
-        # Step 1: Extract project IDs
-        project_ids = self.extract_project_ids(project_name_prefix)
+        # Step 1: Extract project IDs while looking up the collection. The two
+        # listings are independent, so walk them concurrently over the shared session
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            projects_future = executor.submit(self.extract_project_ids, project_name_prefix)
+            lookup_future = executor.submit(self.find_collection_by_name, collection_name)
+            project_ids = projects_future.result()
+            lookup_error = lookup_future.exception()
         
         if not project_ids:
             print("-" * 50)
             print(f"No projects found with prefix '{project_name_prefix}'")
             return []
         
-        # Step 2: Check if collections are available
-        collections = self.get_collections()
+        # Never create a collection when the lookup could not tell whether it exists
+        if lookup_error is not None:
+            self._print_collections_error(lookup_error)
+            response = getattr(lookup_error, 'response', None)
+            if response is not None and response.status_code == 404:
+                self._print_collections_unavailable()
+            else:
+                print(f"❌ Could not check for an existing collection '{collection_name}', so none was created.")
+            return project_ids  # Still return the project IDs even if the collection step failed
         
-        if collections is None or (isinstance(collections, list) and len(collections) == 0 and not collections):
-            print(f"❌ Collections are not available for this organization.")
-            print(f"   This could be because:")
-            print(f"   1. Collections are a premium feature")
-            print(f"   2. Collections are not enabled for your organization")
-            print(f"   3. Your organization type doesn't support collections")
-            print(f"   Please contact Snyk support or upgrade your plan to use collections.")
-            return project_ids  # Still return the project IDs even if collections aren't available
+        # Step 2: Use the collection found above (now indexed) or create an empty one.
+        # A 404 from the create request means collections are not available.
+        collection = self.find_or_create_collection(collection_name)
         
-        # Step 3: Check if collection exists, create if not
-        collection = self.find_collection_by_name(collection_name)
+        if collection is None:
+            self._print_collections_unavailable()
+            return project_ids  # Still return the project IDs even if collections aren't available
         
-        if not collection:
-            # Try to create collection with projects included
-            collection = self.create_collection(collection_name, project_ids)
-            # Add projects to the newly created collection
-            success = self.add_projects_to_collection(collection['id'], project_ids, collection_name)
-        else:
-            print(f"Collection '{collection_name}' already exists (ID: {collection['id']})")
-            # Try to add projects to existing collection
-            success = self.add_projects_to_collection(collection['id'], project_ids, collection_name)
+        # Step 3: Add the projects once
+        success = self.add_projects_to_collection(collection['id'], project_ids, collection_name)
         
         if success:
             print("-" * 50)
@@ -472,8 +846,17 @@ Examples:
         help='Show what would be extracted without making API calls'
     )
     
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='List every matching project and collection'
+    )
+    
     args = parser.parse_args()
     
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, format='%(message)s')
+    
     # Load configuration
     if not args.token or not args.org:
         config = load_config(args.config)